@@ -78,6 +78,9 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        # Keep the test database in memory so schema creation and per-test
+        # rollbacks never touch disk.
+        "TEST": {"NAME": ":memory:"},
     }
 }
 
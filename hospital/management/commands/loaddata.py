@@ -0,0 +1,22 @@
+from django.core.management.commands.loaddata import Command as LoadDataCommand
+
+# Discovery results per (label, app_label, database), shared across command
+# invocations in the same process.
+_fixture_cache = {}
+
+
+class Command(LoadDataCommand):
+    """loaddata with fixture discovery memoized across invocations.
+
+    Django's loaddata already returns before disabling constraint checks
+    when none of the requested fixtures exist, but it still rescans the
+    fixture directories on every call. Tests load the same fixture for
+    every TestCase class, so cache the discovery results for the lifetime
+    of the process.
+    """
+
+    def find_fixtures(self, fixture_label):
+        key = (fixture_label, self.app_label, self.using)
+        if key not in _fixture_cache:
+            _fixture_cache[key] = super().find_fixtures(fixture_label)
+        return _fixture_cache[key]
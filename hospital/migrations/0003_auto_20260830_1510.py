@@ -0,0 +1,41 @@
+# Generated by Django 3.1.6 on 2026-08-30 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0002_auto_20220731_1109'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['last_name'], name='hospital_do_last_na_f36cb0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['birth_year'], name='hospital_do_birth_y_d24524_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['position'], name='hospital_do_positio_77968d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['speciality'], name='hospital_do_special_abfc5c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['first_name'], name='hospital_pa_first_n_a82d41_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['survived'], name='hospital_pa_survive_930e20_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surgery',
+            index=models.Index(fields=['start_datetime'], name='hospital_su_start_d_28ad2b_idx'),
+        ),
+    ]
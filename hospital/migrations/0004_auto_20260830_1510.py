@@ -0,0 +1,17 @@
+# Generated by Django 3.1.6 on 2026-08-30 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0003_auto_20260830_1510'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['first_name', 'last_name'], name='hospital_pa_first_n_987220_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+CREATE_FTS = """
+CREATE VIRTUAL TABLE surgery_fts USING fts5(
+    procedure,
+    content='hospital_surgery',
+    content_rowid='id'
+);
+INSERT INTO surgery_fts(surgery_fts) VALUES('rebuild');
+CREATE TRIGGER surgery_fts_insert AFTER INSERT ON hospital_surgery BEGIN
+    INSERT INTO surgery_fts(rowid, procedure) VALUES (new.id, new.procedure);
+END;
+CREATE TRIGGER surgery_fts_delete AFTER DELETE ON hospital_surgery BEGIN
+    INSERT INTO surgery_fts(surgery_fts, rowid, procedure)
+    VALUES ('delete', old.id, old.procedure);
+END;
+CREATE TRIGGER surgery_fts_update AFTER UPDATE ON hospital_surgery BEGIN
+    INSERT INTO surgery_fts(surgery_fts, rowid, procedure)
+    VALUES ('delete', old.id, old.procedure);
+    INSERT INTO surgery_fts(rowid, procedure) VALUES (new.id, new.procedure);
+END;
+"""
+
+DROP_FTS = """
+DROP TRIGGER surgery_fts_insert;
+DROP TRIGGER surgery_fts_delete;
+DROP TRIGGER surgery_fts_update;
+DROP TABLE surgery_fts;
+"""
+
+
+class Migration(migrations.Migration):
+    """Full-text index over Surgery.procedure.
+
+    The FTS5 table shadows hospital_surgery (content table) and the
+    triggers keep it in sync, so MATCH queries can replace unindexable
+    LIKE '%...%' scans.
+    """
+
+    dependencies = [
+        ("hospital", "0004_auto_20260830_1510"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_FTS, DROP_FTS),
+    ]
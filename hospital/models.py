@@ -30,6 +30,12 @@ class Doctor(models.Model):
 
     class Meta:
         ordering = ("id",)
+        indexes = [
+            models.Index(fields=["last_name"]),
+            models.Index(fields=["birth_year"]),
+            models.Index(fields=["position"]),
+            models.Index(fields=["speciality"]),
+        ]
 
     def __str__(self):
         return "Dr {} {}".format(self.first_name, self.last_name)
@@ -42,6 +48,11 @@ class Patient(models.Model):
 
     class Meta:
         ordering = ("id",)
+        indexes = [
+            models.Index(fields=["first_name"]),
+            models.Index(fields=["first_name", "last_name"]),
+            models.Index(fields=["survived"]),
+        ]
 
     def __str__(self):
         return "{} {}".format(self.first_name, self.last_name)
@@ -66,6 +77,9 @@ class Surgery(models.Model):
     class Meta:
         verbose_name_plural = "Surgeries"
         ordering = ("id",)
+        indexes = [
+            models.Index(fields=["start_datetime"]),
+        ]
 
     def __str__(self):
         return "Surgery at {}".format(self.start_datetime)
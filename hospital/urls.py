@@ -1,7 +1,9 @@
 from django.urls import path
 from .views import get_patients, get_surgery_avg_time
 
+app_name = "hospital"
+
 urlpatterns = [
-    path("patients", get_patients),
-    path("average_surgery_time", get_surgery_avg_time),
+    path("patients", get_patients, name="patients"),
+    path("average_surgery_time", get_surgery_avg_time, name="average_surgery_time"),
 ]
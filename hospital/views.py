@@ -1,28 +1,35 @@
 from django.views import generic
 from .models import Patient, Surgery
+from .queries import JulianDaySeconds
 from django.shortcuts import render
 from django.db.models import Avg, F
-from django.db.models.functions import ExtractSecond
 
 
 def get_patients(request):
-    rows = Patient.objects.all()
-    query = rows.query
+    # Fetch only the displayed columns and stream rows from the cursor so
+    # the view's memory use stays flat however large the table grows.
+    patients = Patient.objects.only("first_name", "last_name", "survived").order_by(
+        "pk"
+    )
+    query = patients.query
+    rows = patients.iterator(chunk_size=500)
 
     return render(request, "hospital/index.html", {"query": query, "rows": rows})
 
 
 def get_surgery_avg_time(request):
-    # TODO: make it work
+    # The average is a single SQL aggregate, so no Surgery rows are loaded.
     rows = Surgery.objects.aggregate(
-        avrage_time=Avg(
-            ExtractSecond(F("start_endetime")) - ExtractSecond(F("d_datetime"))
+        average_time=Avg(
+            JulianDaySeconds(F("end_datetime")) - JulianDaySeconds(F("start_datetime"))
         )
     )
-    # query = rows.query
     query = None
 
     return render(
-        request, "hospital/index.html", {"query": query, "rows": {rows["avrage_time"]}}
+        request,
+        "hospital/index.html",
+        # The template renders row.avg_time, so wrap the bare float.
+        {"query": query, "rows": [{"avg_time": rows["average_time"]}]},
     )
 